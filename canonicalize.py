@@ -0,0 +1,117 @@
+import re
+import fnmatch
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit, unquote_plus
+
+# 默认规范化规则，可在 config.yaml 的 canonicalization 节点全局覆盖，
+# 也可以在 sites[].canonicalization 中按站点覆盖。
+# 规范化结果只用作去重比对的 key，入库和通知仍使用原始 URL。
+DEFAULT_RULES = {
+    'enabled': True,
+    'lowercase_host': True,
+    'strip_www': True,
+    'strip_trailing_slash': True,
+    'drop_fragment': True,
+    'drop_query_params': ['utm_*', 'fbclid', 'gclid'],
+    'sort_query': True,
+    'batch_size': 500,  # dedupe_urls.py 每批处理的行数
+}
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def get_site_rules(config, site_name):
+    """Merge default, global and per-site canonicalization rules."""
+    rules = dict(DEFAULT_RULES)
+    rules.update((config or {}).get('canonicalization') or {})
+    for site_conf in (config or {}).get('sites', []):
+        if site_conf.get('name') == site_name:
+            rules.update(site_conf.get('canonicalization') or {})
+            break
+    return rules
+
+
+@lru_cache(maxsize=1024)
+def normalize_host(scheme, netloc, lowercase_host, strip_www):
+    # Sitemap 中同一站点的 host 高度重复，缓存避免每条 URL 重复解析
+    parts = urlsplit(f"//{netloc}")
+    host = parts.hostname or ''
+    port = parts.port
+    if not lowercase_host:
+        # hostname 总是小写，这里从原始 netloc 中取回原始大小写
+        start = netloc.lower().rfind(host)
+        host = netloc[start:start + len(host)]
+    if strip_www and host.lower().startswith('www.'):
+        host = host[4:]
+    if ':' in host:
+        host = f"[{host}]"
+    if port is not None and DEFAULT_PORTS.get(scheme) != port:
+        host = f"{host}:{port}"
+    userinfo, sep, _ = netloc.rpartition('@')
+    return f"{userinfo}{sep}{host}"
+
+
+def compile_rules(rules):
+    """Build a canonicalize(url) -> dedup key function from a rules dict."""
+    if not rules.get('enabled', True):
+        return lambda url: url.strip()
+
+    lowercase_host = bool(rules.get('lowercase_host'))
+    strip_www = bool(rules.get('strip_www'))
+    strip_trailing_slash = bool(rules.get('strip_trailing_slash'))
+    drop_fragment = bool(rules.get('drop_fragment'))
+    sort_query = bool(rules.get('sort_query'))
+
+    # 将通配符参数名合并成一个预编译正则，每个参数只匹配一次
+    patterns = rules.get('drop_query_params') or []
+    drop_param = None
+    if patterns:
+        drop_param = re.compile('|'.join(fnmatch.translate(p) for p in patterns), re.IGNORECASE).match
+
+    def canonicalize(url):
+        url = url.strip()
+        try:
+            parts = urlsplit(url)
+            # urlsplit 已将 scheme 转为小写
+            netloc = normalize_host(parts.scheme, parts.netloc, lowercase_host, strip_www)
+        except ValueError:
+            return url
+        if not parts.scheme or not parts.netloc:
+            return url
+
+        path = parts.path
+        if strip_trailing_slash:
+            path = path.rstrip('/')
+        path = path or '/'
+
+        # 按原始片段处理查询串，保留的参数不重新编码
+        query = parts.query
+        if query and (drop_param or sort_query):
+            params = [p for p in query.split('&') if p]
+            if drop_param:
+                params = [p for p in params if not drop_param(unquote_plus(p.partition('=')[0]))]
+            if sort_query:
+                params.sort()
+            query = '&'.join(params)
+
+        fragment = '' if drop_fragment else parts.fragment
+        return urlunsplit((parts.scheme, netloc, path, query, fragment))
+
+    return canonicalize
+
+
+def iter_batches(items, batch_size):
+    batch_size = max(int(batch_size or 1), 1)
+    for i in range(0, len(items), batch_size):
+        yield items[i:i + batch_size]
+
+
+def dedupe_urls_by_key(urls, canonicalize):
+    """Map canonical key -> first-seen original url, keeping sitemap order."""
+    result = {}
+    for url in urls:
+        url = url.strip()
+        if not url:
+            continue
+        result.setdefault(canonicalize(url), url)
+    return result
@@ -0,0 +1,102 @@
+import argparse
+import os
+import yaml
+from sqlmodel import select, delete
+from models import Site, UrlRecord
+from database import get_session, init_db
+from canonicalize import get_site_rules, compile_rules, iter_batches
+
+def dedupe_site(session, site, rules, batch_size, dry_run=False):
+    canonicalize = compile_rules(rules)
+
+    # 按 id 分页扫描，避免一次性把整张表读进内存
+    # canonical key -> [first_seen_time, id, is_new, merged_is_new]
+    keepers = {}
+    duplicate_ids = []
+    last_id = 0
+    while True:
+        rows = session.exec(
+            select(UrlRecord.id, UrlRecord.url, UrlRecord.first_seen_time, UrlRecord.is_new)
+            .where(UrlRecord.site_id == site.id, UrlRecord.id > last_id)
+            .order_by(UrlRecord.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        for record_id, url, first_seen_time, is_new in rows:
+            key = canonicalize(url)
+            current = [first_seen_time, record_id, is_new, is_new]
+            kept = keepers.get(key)
+            if kept is None:
+                keepers[key] = current
+                continue
+            # 保留最早发现的记录；只要有一条是历史数据，就不再算作新增
+            winner, loser = (current, kept) if current[:2] < kept[:2] else (kept, current)
+            winner[3] = winner[3] and loser[3]
+            keepers[key] = winner
+            duplicate_ids.append(loser[1])
+
+    # record id -> is_new，只更新标记有变化的保留行；保留行的原始 URL 不改写
+    updates = {
+        record_id: merged_is_new
+        for _, record_id, is_new, merged_is_new in keepers.values()
+        if is_new != merged_is_new
+    }
+
+    if dry_run:
+        return len(duplicate_ids), len(updates)
+
+    # 先删除重复行，再更新保留行的 is_new 标记
+    for chunk in iter_batches(duplicate_ids, batch_size):
+        session.exec(delete(UrlRecord).where(UrlRecord.id.in_(chunk)))
+        session.commit()
+
+    for chunk in iter_batches(list(updates), batch_size):
+        records = session.exec(select(UrlRecord).where(UrlRecord.id.in_(chunk))).all()
+        for record in records:
+            record.is_new = updates[record.id]
+            session.add(record)
+        session.commit()
+
+    return len(duplicate_ids), len(updates)
+
+def dedupe_urls(site_name=None, batch_size=None, dry_run=False):
+    init_db()
+    session = get_session()
+
+    config = {}
+    if os.path.exists('config.yaml'):
+        with open('config.yaml') as f:
+            config = yaml.safe_load(f) or {}
+
+    query = select(Site)
+    if site_name:
+        query = query.where(Site.name == site_name)
+    sites = session.exec(query).all()
+    if not sites:
+        print("No sites found.")
+        return
+
+    try:
+        for site in sites:
+            rules = get_site_rules(config, site.name)
+            if not rules.get('enabled', True):
+                print(f"  Canonicalization disabled for {site.name}. Skipping.")
+                continue
+            size = batch_size or rules.get('batch_size')
+            removed, updated = dedupe_site(session, site, rules, size, dry_run=dry_run)
+            prefix = "[dry-run] " if dry_run else ""
+            print(f"  {prefix}{site.name}: removed {removed} duplicate rows, updated {updated} is_new flags")
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collapse duplicate UrlRecord rows by canonical URL")
+    parser.add_argument('--site', help='Only process the given site name')
+    parser.add_argument('--batch-size', type=int, help='Rows per chunk (defaults to canonicalization.batch_size)')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+    args = parser.parse_args()
+
+    dedupe_urls(site_name=args.site, batch_size=args.batch_size, dry_run=args.dry_run)
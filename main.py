@@ -16,6 +16,7 @@ from bs4 import BeautifulSoup
 from sqlmodel import Session, select
 from models import Site, UrlRecord, Category
 from database import get_session, init_db
+from canonicalize import get_site_rules, compile_rules, dedupe_urls_by_key
 
 # 设置日志记录
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -132,14 +133,21 @@ def check_site(session: Session, site: Site, config):
         urls = process_sitemap(sm_url)
         all_qs.extend(urls)
         
-    unique_urls = set(all_qs)
+    # 以规范化 URL 作为去重 key，避免尾斜杠、utm 参数、www 等变体被当成新游戏；
+    # 入库和通知仍使用首次出现的原始 URL
+    canonicalize = compile_rules(get_site_rules(config, site.name))
+    unique_urls = dedupe_urls_by_key(all_qs, canonicalize)
+
+    # 一次性取出该站点已有 URL，同样规范化后再比对
+    existing_keys = {
+        canonicalize(url)
+        for url in session.exec(select(UrlRecord.url).where(UrlRecord.site_id == site.id)).all()
+    }
     
     new_found_urls = []
     
-    for url in unique_urls:
-        # Check if URL exists in DB
-        exists = session.exec(select(UrlRecord).where(UrlRecord.url == url, UrlRecord.site_id == site.id)).first()
-        if not exists:
+    for key, url in unique_urls.items():
+        if key not in existing_keys:
             # Add new record
             record = UrlRecord(
                 url=url,
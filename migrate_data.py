@@ -5,6 +5,7 @@ from pathlib import Path
 from sqlmodel import Session, select
 from models import Site, UrlRecord, Category
 from database import get_session, init_db
+from canonicalize import get_site_rules, compile_rules
 
 def migrate_data():
     init_db()
@@ -20,6 +21,7 @@ def migrate_data():
         session.refresh(default_cat)
     
     # 2. Sync Sites from config.yaml
+    config = {}
     if os.path.exists('config.yaml'):
         with open('config.yaml') as f:
             config = yaml.safe_load(f)
@@ -79,8 +81,13 @@ def migrate_data():
             urls = content.splitlines()
             
         # Bulk Insert URLs
-        # To avoid massive slow-down, we fetch all existing URLs for this site first
-        existing_urls = set(session.exec(select(UrlRecord.url).where(UrlRecord.site_id == site.id)).all())
+        # To avoid massive slow-down, we fetch all existing URLs for this site first.
+        # Compare by canonical key so URL variants don't come back as duplicates.
+        canonicalize = compile_rules(get_site_rules(config, site_name))
+        existing_keys = {
+            canonicalize(url)
+            for url in session.exec(select(UrlRecord.url).where(UrlRecord.site_id == site.id)).all()
+        }
         
         new_records = []
         for url in urls:
@@ -88,13 +95,14 @@ def migrate_data():
             if not url:
                 continue
                 
-            if url not in existing_urls:
+            key = canonicalize(url)
+            if key not in existing_keys:
                 new_records.append(UrlRecord(
                     url=url,
                     site_id=site.id,
                     is_new=False # Historical data
                 ))
-                existing_urls.add(url) # Update local set to avoid dupes within the file itself
+                existing_keys.add(key) # Update local set to avoid dupes within the file itself
         
         if new_records:
             session.add_all(new_records)